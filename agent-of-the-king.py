@@ -3,16 +3,18 @@ import re
 import asyncio
 import contextlib
 from urllib.parse import quote
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Mapping, Optional
 
 import aiohttp
 import discord
+import orjson
 from discord import app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
-from rapidfuzz import process, fuzz
 
+import matching
 from availability_service import AvailabilityStore
+from matching import find_matching_cards
 
 # -----------------------------
 # Config / startup
@@ -35,17 +37,30 @@ INTENTS.guilds = True
 # Required for reliable role membership lookups used by heatmap/profile refresh.
 INTENTS.members = True
 
-bot = commands.Bot(command_prefix="!", intents=INTENTS)
+
+class AgentOfTheKingBot(commands.Bot):
+    async def close(self) -> None:
+        await close_http_session()
+        await super().close()
+
+
+bot = AgentOfTheKingBot(command_prefix="!", intents=INTENTS)
 TREE = bot.tree
 STORE = AvailabilityStore()
 
 # ArkhamDB cache
 CARDS: List[Dict[str, Any]] = []
 CARDS_URL = "https://www.arkhamdb.com/api/public/cards?encounter=1"
+# On-disk copy of the cards payload plus its ETag/Last-Modified, revalidated with a conditional GET
+CARDS_CACHE_PATH = os.getenv("CARDS_CACHE_PATH", "cards.json")
+CARDS_CACHE_META_PATH = os.path.splitext(CARDS_CACHE_PATH)[0] + ".etag"
+
+# Shared HTTP session for ArkhamDB requests (created in on_ready, closed with the bot)
+HTTP_SESSION: Optional[aiohttp.ClientSession] = None
 
-# Name index for fuzzy matching
-NAME_INDEX: Dict[str, List[Dict[str, Any]]] = {}
-NAME_KEYS: List[str] = []
+# Prebuilt card embeds by card code (cleared whenever the card cache reloads).
+# These are shared between messages: treat them as read-only.
+EMBED_CACHE: Dict[str, discord.Embed] = {}
 
 # Limits
 MAX_CARD_MATCHES = 8  # parity with your Reddit bot
@@ -55,11 +70,15 @@ EMBEDS_PER_MESSAGE_LIMIT = 10
 FOOTER_TEXT = "I am a bot • GitHub: hardingalexh/agent-of-the-king-reddit"
 
 # Regex
-CARD_TOKEN_RE = re.compile(r"\[\[(.+?)\]\]")
-DECK_URL_RE = re.compile(
-    r"(https?://)?(www\.)?arkhamdb\.com/(deck/view|decklist/view)/([^\s\])\)]*)",
+# Card searches [[...]] and ArkhamDB deck URLs, found in a single scan of the message
+MESSAGE_RE = re.compile(
+    r"\[\[(?P<card>.+?)\]\]"
+    r"|(?:https?://)?(?:www\.)?arkhamdb\.com/(?P<kind>deck/view|decklist/view)/(?P<tail>[^\s\[\])\)]*)",
     re.IGNORECASE,
 )
+# ArkhamDB formatting -> Discord markdown, applied in a single pass
+_FMT_RE = re.compile(r"\[\[|\]\]|<b>|</b>|<i>|</i>")
+_FMT_MAP = {"[[": "**", "]]": "**", "<b>": "**", "</b>": "**", "<i>": "_", "</i>": "_"}
 
 DAYS = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
 TIME_SLOTS = [f"{hour:02d}:{minute:02d}" for hour in range(24) for minute in (0, 30)]
@@ -119,11 +138,8 @@ def process_text(text: Optional[str]) -> str:
     if not text:
         return ""
     # ArkhamDB formatting -> Discord
-    text = text.replace("[[", "**").replace("]]", "**")
-    text = text.replace("<b>", "**").replace("</b>", "**")
-    text = text.replace("<i>", "_").replace("</i>", "_")
     # Reddit-style "two spaces + newline" isn't needed; Discord uses \n
-    return text
+    return _FMT_RE.sub(lambda m: _FMT_MAP[m.group(0)], text)
 
 
 def process_symbols(card: Dict[str, Any]) -> str:
@@ -137,6 +153,20 @@ def process_symbols(card: Dict[str, Any]) -> str:
 
 
 def card_to_embed(card: Dict[str, Any]) -> discord.Embed:
+    """
+    Returns the cached embed for this card, building it on first use.
+    The embed is shared by every message that shows the card, so callers must not mutate it.
+    """
+    code = card.get("code")
+    cached = EMBED_CACHE.get(code) if code else None
+    if cached is None:
+        cached = _build_card_embed(card)
+        if code:
+            EMBED_CACHE[code] = cached
+    return cached
+
+
+def _build_card_embed(card: Dict[str, Any]) -> discord.Embed:
     name = card.get("name", "Unknown")
     url = card.get("url") or ""
     xp = card.get("xp")
@@ -197,161 +227,162 @@ def card_to_embed(card: Dict[str, Any]) -> discord.Embed:
 
 
 def chunk_embeds(embeds: List[discord.Embed], size: int = EMBEDS_PER_MESSAGE_LIMIT):
+    # Common case: everything fits in one message, so don't slice a copy
+    if len(embeds) <= size:
+        if embeds:
+            yield embeds
+        return
     for i in range(0, len(embeds), size):
         yield embeds[i : i + size]
 
 
-def set_footer_on_all(embeds: List[discord.Embed]) -> None:
-    for e in embeds:
-        if not e.footer:
-            e.set_footer(text=FOOTER_TEXT)
-
-
-def parse_level_search(term: str):
+def scan_message(content: str) -> tuple[List[str], Optional[re.Match]]:
     """
-    Supports 'Card Name (u)' for any upgraded, or '(2)' for exact level.
-    Returns (search_term:str, level_filter: Optional[callable])
+    One pass over a message: returns (card search tokens, first deck URL match).
+    Tokens are stripped, non-empty, and deduped in order so repeated tokens are matched once.
     """
-    m = re.search(r"\((.+?)\)$", term.strip())
-    if not m:
-        return term.strip().lower(), None
-    level = m.group(1).strip()
-    search_term = term[: m.span()[0]].strip().lower()
-
-    def level_filter(card: Dict[str, Any]) -> bool:
-        xp = card.get("xp", 0) or 0
-        if level.lower() == "u":
-            return (search_term in card.get("name", "").lower()) and xp > 0
-        try:
-            n = int(level)
-            return (search_term in card.get("name", "").lower()) and xp == n
-        except ValueError:
-            return search_term in card.get("name", "").lower()
+    deck_match: Optional[re.Match] = None
+    raw_tokens: List[str] = []
+    for m in MESSAGE_RE.finditer(content):
+        card = m.group("card")
+        if card is None:
+            if deck_match is None:
+                deck_match = m
+            continue
+        raw_tokens.append(card)
+        if deck_match is None:
+            # A deck URL written inside [[...]] still counts as a deck link
+            deck_match = next((inner for inner in MESSAGE_RE.finditer(card) if inner.group("kind")), None)
 
-    return search_term, level_filter
+    card_tokens = list(dict.fromkeys(t.strip() for t in raw_tokens if t.strip()))
+    return card_tokens, deck_match
 
 
-def _norm(s: str) -> str:
-    # Lowercase and strip non-alphanumerics so "Lucky!" == "lucky"
-    return re.sub(r'[^a-z0-9]+', '', (s or '').lower())
+def is_big_response(card_count: int, deck_embed_count: int = 0) -> bool:
+    # Thread threshold: >3 cards or deck output likely spanning multiple messages
+    return card_count > 3 or deck_embed_count > 10
 
 
-def _build_name_index(cards: List[Dict[str, Any]]):
-    """Map normalized name -> list of card dicts (all printings)."""
-    idx: Dict[str, List[Dict[str, Any]]] = {}
-    for c in cards:
-        n = _norm(c.get('name') or '')
-        if not n:
-            continue
-        idx.setdefault(n, []).append(c)
-    return idx
+# -----------------------------
+# ArkhamDB I/O
+# -----------------------------
+def get_http_session() -> aiohttp.ClientSession:
+    """Return the shared ArkhamDB session, creating it on first use so keep-alive connections are pooled."""
+    global HTTP_SESSION
+    if HTTP_SESSION is None or HTTP_SESSION.closed:
+        HTTP_SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=50,
+                limit_per_host=10,
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+            ),
+            timeout=aiohttp.ClientTimeout(total=30),
+            headers={"User-Agent": "AgentOfTheKing/1.0"},
+        )
+    return HTTP_SESSION
 
 
-def _refresh_name_index():
-    global NAME_INDEX, NAME_KEYS
-    NAME_INDEX = _build_name_index(CARDS)
-    NAME_KEYS = list(NAME_INDEX.keys())
+async def close_http_session() -> None:
+    global HTTP_SESSION
+    if HTTP_SESSION is not None and not HTTP_SESSION.closed:
+        await HTTP_SESSION.close()
+    HTTP_SESSION = None
 
 
-def find_matching_cards(queries: List[str]) -> List[Dict[str, Any]]:
-    """
-    Matching order per token:
-    1) Exact name (normalized) -> if no (level), pick lowest XP printing; else include all matching level.
-    2) Substring fallback -> one lowest-XP printing per distinct name.
-    3) Fuzzy fallback -> best normalized name over NAME_KEYS, threshold 80; pick lowest XP (respect level if provided).
-    """
-    matches: List[Dict[str, Any]] = []
-    seen_codes = set()
+async def fetch_body(url: str, headers: Optional[Dict[str, str]] = None) -> tuple[Optional[bytes], Mapping[str, str]]:
+    """GET through the shared session; returns (body, response headers), with body None on 304 Not Modified."""
+    async with get_http_session().get(url, allow_redirects=True, headers=headers) as resp:
+        if resp.status == 304:
+            return None, resp.headers
+        resp.raise_for_status()
+        return await resp.read(), resp.headers
 
-    for q in queries:
-        q = q.strip()
-        if not q:
-            continue
 
-        base, level_fn = parse_level_search(q)
-        base_norm = _norm(base)
-
-        # --- EXACT NAME PATH (normalized, e.g., "Lucky!" == "lucky") ---
-        exacts = [c for c in CARDS if _norm(c.get('name') or '') == base_norm and (not level_fn or level_fn(c))]
-        if exacts:
-            # No level given -> lowest XP printing only; else include all passing level filter
-            picks = [min(exacts, key=lambda c: (c.get('xp') or 0))] if not level_fn else exacts
-            for c in picks:
-                code = c.get('code')
-                if code and code not in seen_codes:
-                    seen_codes.add(code)
-                    matches.append(c)
-            continue  # prefer exact; skip substring for this token
-
-        # --- SUBSTRING FALLBACK (return one lowest-XP per distinct name) ---
-        by_name_lowest: Dict[str, Dict[str, Any]] = {}
-        for c in CARDS:
-            name = (c.get('name') or '')
-            if base in name.lower() and (not level_fn or level_fn(c)):
-                key = _norm(name)
-                cur = by_name_lowest.get(key)
-                if cur is None or (c.get('xp') or 0) < (cur.get('xp') or 0):
-                    by_name_lowest[key] = c
-
-        if by_name_lowest:
-            for c in by_name_lowest.values():
-                code = c.get('code')
-                if code and code not in seen_codes:
-                    seen_codes.add(code)
-                    matches.append(c)
-            continue
+async def fetch_json(url: str) -> Any:
+    body, _ = await fetch_body(url)
+    # Accept JSON even if Content-Type header is off
+    return orjson.loads(body)
 
-        # --- FUZZY FALLBACK (only if nothing else matched) ---
-        if NAME_KEYS:
-            best = process.extractOne(base_norm, NAME_KEYS, scorer=fuzz.token_set_ratio)
-            if best and best[1] >= 80:  # tweak threshold 75–85 as desired
-                best_key = best[0]
-                variants = NAME_INDEX.get(best_key, [])
-                if level_fn:
-                    variants = [c for c in variants if level_fn(c)]
-                if variants:
-                    pick = min(variants, key=lambda c: (c.get('xp') or 0))
-                    code = pick.get('code')
-                    if code and code not in seen_codes:
-                        seen_codes.add(code)
-                        matches.append(pick)
 
-    return matches
+def _read_cards_cache_validators() -> Dict[str, str]:
+    """ETag/Last-Modified saved alongside cards.json, or {} if there's no usable sidecar."""
+    try:
+        with open(CARDS_CACHE_META_PATH, "rb") as f:
+            meta = orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return {}
+    if not isinstance(meta, dict):
+        return {}
+    return {k: v for k, v in meta.items() if isinstance(v, str) and v}
 
 
-def is_big_response(card_count: int, deck_embed_count: int = 0) -> bool:
-    # Thread threshold: >3 cards or deck output likely spanning multiple messages
-    return card_count > 3 or deck_embed_count > 10
+def _read_cached_cards() -> Optional[List[Dict[str, Any]]]:
+    """Parse cards.json (only needed after a 304); None if it's missing or damaged."""
+    try:
+        with open(CARDS_CACHE_PATH, "rb") as f:
+            cards = orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    return cards if isinstance(cards, list) else None
 
 
-# -----------------------------
-# ArkhamDB I/O
-# -----------------------------
-async def fetch_json(session: aiohttp.ClientSession, url: str) -> Any:
-    async with session.get(
-        url,
-        allow_redirects=True,
-        timeout=aiohttp.ClientTimeout(total=30),
-        headers={"User-Agent": "AgentOfTheKing/1.0"},
-    ) as resp:
-        resp.raise_for_status()
-        # Accept JSON even if Content-Type header is off
-        return await resp.json(content_type=None)
+def _discard_cards_cache() -> None:
+    for path in (CARDS_CACHE_PATH, CARDS_CACHE_META_PATH):
+        with contextlib.suppress(OSError):
+            os.remove(path)
+
+
+def _write_cards_cache(body: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+    meta = {"etag": etag, "last_modified": last_modified}
+    try:
+        # Write to temp files first so a crash never leaves a half-written cache behind
+        for path, data in ((CARDS_CACHE_PATH, body), (CARDS_CACHE_META_PATH, orjson.dumps(meta))):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+    except OSError as exc:
+        print(f"Failed to write card cache to {CARDS_CACHE_PATH}: {exc}")
 
 
 async def load_cards():
     global CARDS
-    async with aiohttp.ClientSession() as session:
-        CARDS = await fetch_json(session, CARDS_URL)
-    _refresh_name_index()
+    # Cache file I/O runs on a worker thread so reloads don't stall the gateway
+    validators = await asyncio.to_thread(_read_cards_cache_validators)
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+
+    body, resp_headers = await fetch_body(CARDS_URL, headers=headers)
+    cards = None
+    if body is None:
+        cards = await asyncio.to_thread(_read_cached_cards)
+        if cards is None:
+            # Not modified, but our copy is gone or damaged: drop it and fetch unconditionally
+            await asyncio.to_thread(_discard_cards_cache)
+            body, resp_headers = await fetch_body(CARDS_URL)
+            if body is None:
+                raise RuntimeError("ArkhamDB answered 304 to an unconditional card request")
+    if cards is None:
+        cards = orjson.loads(body)
+        await asyncio.to_thread(
+            _write_cards_cache, body, resp_headers.get("ETag"), resp_headers.get("Last-Modified")
+        )
+
+    CARDS = cards
+    matching.refresh_name_index(CARDS)
+    EMBED_CACHE.clear()
 
 
 async def fetch_deck(deck_url_match: re.Match) -> Dict[str, Any]:
     """
-    Accepts a regex match against DECK_URL_RE, returns deck JSON and a type ('deck' | 'decklist') and the id.
+    Accepts a deck URL match from MESSAGE_RE, returns deck JSON and a type ('deck' | 'decklist') and the id.
     """
-    kind = deck_url_match.group(3).lower()  # 'deck/view' or 'decklist/view'
-    raw_tail = deck_url_match.group(4)
+    kind = deck_url_match.group("kind").lower()  # 'deck/view' or 'decklist/view'
+    raw_tail = deck_url_match.group("tail")
     deck_id = (raw_tail or "").split("/")[0].split("]")[0].split(")")[0]
     api_url = None
     deck_type = None
@@ -362,16 +393,24 @@ async def fetch_deck(deck_url_match: re.Match) -> Dict[str, Any]:
         deck_type = "decklist"
         api_url = f"https://arkhamdb.com/api/public/decklist/{deck_id}"
 
-    async with aiohttp.ClientSession() as session:
-        data = await fetch_json(session, api_url)
-        return {"type": deck_type, "id": deck_id, "json": data}
+    data = await fetch_json(api_url)
+    return {"type": deck_type, "id": deck_id, "json": data}
+
+
+def _deck_card_line(card: Dict[str, Any], qty: int) -> str:
+    # One f-string per line instead of concatenating intermediate pieces
+    xp = card.get("xp")
+    xp_part = f" ({xp})" if xp else ""
+    return f"- {qty} × [{card.get('name', '')}]{xp_part} ({card.get('url', '')})"
 
 
 def build_deck_embeds(deck: Dict[str, Any]) -> List[discord.Embed]:
+    # Runs on a worker thread; bind the index once so a concurrent load_cards can't swap it mid-build
+    cards_by_code = matching.CARDS_BY_CODE
+    card_position = matching.CARD_POSITION
     data = deck["json"]
     investigator_code = data.get("investigator_code")
-    gators = [c for c in CARDS if c.get("code") == investigator_code]
-    gator = gators[0] if gators else {}
+    gator = cards_by_code.get(investigator_code) or {}
     inv_name = gator.get("name", "Investigator")
     deck_name = data.get("name", "")
     version = data.get("version", "")
@@ -391,46 +430,38 @@ def build_deck_embeds(deck: Dict[str, Any]) -> List[discord.Embed]:
 
     # Gather cards used in deck
     slots = data.get("slots", {}) or {}
-    deck_cards = [c for c in CARDS if (c.get("code") or "") in slots.keys()]
+    # Look slots up by code, then restore card list order (what the old full scan over CARDS produced)
+    deck_codes = sorted((code for code in slots if code in cards_by_code), key=lambda code: card_position.get(code, 0))
+    deck_cards = [cards_by_code[code] for code in deck_codes]
 
     # Categories
     categories = ["Asset", "Permanent", "Event", "Skill", "Treachery", "Enemy"]
+    by_category: Dict[str, List[Dict[str, Any]]] = {}
+    for c in deck_cards:
+        if c.get("permanent") is True:
+            by_category.setdefault("permanent", []).append(c)
+        elif not c.get("permanent"):
+            by_category.setdefault(c.get("type_code", ""), []).append(c)
+
     for category in categories:
-        if category == "Permanent":
-            cat_cards = [c for c in deck_cards if c.get("permanent") is True]
-        else:
-            cat_cards = [
-                c
-                for c in deck_cards
-                if (c.get("type_code", "") == category.lower() and not c.get("permanent"))
-            ]
+        cat_cards = by_category.get(category.lower())
         if not cat_cards:
             continue
 
-        # For assets: group by slot
-        if category == "Asset":
-            cat_cards.sort(key=lambda e: e.get("slot", "zzzzzz"))
-
         embed = discord.Embed(title=f"{category}s")
         parts: List[str] = []
 
         if category == "Asset":
-            last_slot = None
+            # For assets: group by slot (one bucket per slot, cards keep deck order within it)
+            by_slot: Dict[str, List[Dict[str, Any]]] = {}
             for card in cat_cards:
-                qty = slots.get(card.get("code"), 1)
-                line = f"{qty} × [{card.get('name','')}]" + (f" ({card.get('xp')})" if card.get("xp") else "")
-                line += f" ({card.get('url','')})"
-                slot = card.get("slot", "Other")
-                if slot != last_slot:
-                    parts.append(f"\n**{slot}:**")
-                    last_slot = slot
-                parts.append(f"- {line}")
+                by_slot.setdefault(card.get("slot") or "Other", []).append(card)
+            # Slot headers stay alphabetical with slotless assets last
+            for slot in sorted(by_slot, key=lambda s: (s == "Other", s)):
+                parts.append(f"\n**{slot}:**")
+                parts.extend(_deck_card_line(card, slots.get(card.get("code"), 1)) for card in by_slot[slot])
         else:
-            for card in cat_cards:
-                qty = slots.get(card.get("code"), 1)
-                line = f"{qty} × [{card.get('name','')}]" + (f" ({card.get('xp')})" if card.get("xp") else "")
-                line += f" ({card.get('url','')})"
-                parts.append(f"- {line}")
+            parts.extend(_deck_card_line(card, slots.get(card.get("code"), 1)) for card in cat_cards)
 
         # Discord field length safety; split across multiple embeds if huge
         text = "\n".join(parts)
@@ -461,7 +492,8 @@ def build_deck_embeds(deck: Dict[str, Any]) -> List[discord.Embed]:
 
 
 async def send_embeds_in_batches(target: discord.abc.Messageable, embeds: List[discord.Embed]):
-    set_footer_on_all(embeds)
+    # Builders set FOOTER_TEXT on every embed they create, so there's no footer pass here.
+    # Batches go out one at a time so split decks ("Assets [1/3]", "[2/3]", ...) stay in order.
     for batch in chunk_embeds(embeds):
         await target.send(embeds=batch)
 
@@ -483,6 +515,9 @@ async def sync_app_commands() -> None:
 
 @bot.event
 async def on_ready():
+    # Reuse one pooled session for every ArkhamDB fetch instead of reconnecting per request.
+    get_http_session()
+
     # Load cards once on startup, but do not block slash command registration if it fails.
     try:
         await load_cards()
@@ -505,11 +540,9 @@ async def on_message(message: discord.Message):
 
     content = message.content or ""
 
-    # Extract deck URLs (first, since they don't count against "no results" for cards)
-    deck_match = DECK_URL_RE.search(content)
-
-    # Extract card searches [[...]]
-    card_tokens = CARD_TOKEN_RE.findall(content)
+    # Extract card searches [[...]] and the first deck URL
+    # (deck URLs don't count against "no results" for cards)
+    card_tokens, deck_match = scan_message(content)
 
     # Nothing for us to do
     if not deck_match and not card_tokens:
@@ -521,7 +554,8 @@ async def on_message(message: discord.Message):
     # Build card embeds
     card_embeds: List[discord.Embed] = []
     if card_tokens:
-        matches = find_matching_cards(card_tokens)
+        # One past the hand limit is enough to know we have to refuse
+        matches = find_matching_cards(card_tokens, limit=MAX_CARD_MATCHES + 1)
         if len(matches) > MAX_CARD_MATCHES:
             await message.reply("Your search returned more than 8 cards, and that's my hand limit. Take 1 horror.")
             return
@@ -535,7 +569,8 @@ async def on_message(message: discord.Message):
     if deck_match:
         try:
             deck = await fetch_deck(deck_match)
-            deck_embeds = build_deck_embeds(deck)
+            # Keep the gateway responsive while the deck is rendered
+            deck_embeds = await asyncio.to_thread(build_deck_embeds, deck)
         except Exception:
             await message.reply("Something went wrong attempting to retrieve your deck from ArkhamDB. Take 1 horror.")
             deck_embeds = []
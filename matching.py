@@ -0,0 +1,235 @@
+"""
+Card-name matching for [[...]] searches.
+
+No Discord/aiohttp imports here so the module can be compiled with mypyc
+(see setup.py); the plain .py is used whenever no compiled build is present.
+"""
+import functools
+import re
+import string
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from rapidfuzz import fuzz, process
+
+# Name index for fuzzy matching
+NAME_INDEX: Dict[str, List[Dict[str, Any]]] = {}
+NAME_KEYS: List[str] = []
+# Card code -> card dict
+CARDS_BY_CODE: Dict[str, Dict[str, Any]] = {}
+# Card code -> position in the card list, so deck output keeps the card list's order
+CARD_POSITION: Dict[str, int] = {}
+# Lowest-XP printing per normalized name
+LOWEST_XP_BY_NORM: Dict[str, Dict[str, Any]] = {}
+# Parallel lists over every card, precomputed so matching never re-lowercases/normalizes names
+CARDS_FLAT: List[Dict[str, Any]] = []
+NAMES_LOWER: List[str] = []
+NAMES_NORM: List[str] = []
+# Lowercase name 3-gram -> ascending CARDS_FLAT indices, used to narrow the substring fallback
+NGRAM_SIZE = 3
+NGRAM_INDEX: Dict[str, List[int]] = {}
+
+# Trailing "(u)" / "(2)" level filter on a card search
+_LEVEL_RE = re.compile(r"\((.+?)\)\s*$")
+# _norm: keep only [a-z0-9]; ASCII goes through a translate table, the regex handles anything else
+_NORM_KEEP = set(string.ascii_lowercase + string.digits)
+_NORM_TABLE = {i: None for i in range(128) if chr(i) not in _NORM_KEEP}
+_NORM_RE = re.compile(r"[^a-z0-9]+")
+# rapidfuzz's stubs say extractOne never returns None, but it does on a score_cutoff miss;
+# calling through an Any alias keeps mypyc from enforcing the stub's return type at runtime.
+_extract_one: Any = process.extractOne
+
+
+def parse_level_search(term: str) -> Tuple[str, Optional[Callable[[Dict[str, Any]], bool]]]:
+    """
+    Supports 'Card Name (u)' for any upgraded, or '(2)' for exact level.
+    Returns (search_term:str, level_filter: Optional[callable])
+    """
+    term = term.strip()
+    m = _LEVEL_RE.search(term)
+    if not m:
+        return term.lower(), None
+    level = m.group(1).strip()
+    search_term = term[: m.start()].strip().lower()
+
+    # Parse the level once, not once per card evaluated
+    upgraded = level.lower() == "u"
+    try:
+        exact_xp: Optional[int] = int(level)
+    except ValueError:
+        exact_xp = None
+
+    def level_filter(card: Dict[str, Any]) -> bool:
+        if search_term not in card.get("name", "").lower():
+            return False
+        xp = card.get("xp", 0) or 0
+        if upgraded:
+            return xp > 0
+        if exact_xp is not None:
+            return xp == exact_xp
+        return True
+
+    return search_term, level_filter
+
+
+def _norm(s: Optional[str]) -> str:
+    # Lowercase and strip non-alphanumerics so "Lucky!" == "lucky"
+    out = (s or '').lower().translate(_NORM_TABLE)
+    if out.isascii():
+        return out
+    # Rare non-ASCII names: drop whatever the ASCII table couldn't
+    return _NORM_RE.sub('', out)
+
+
+def _build_name_index(cards: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Map normalized name -> list of card dicts (all printings)."""
+    idx: Dict[str, List[Dict[str, Any]]] = {}
+    for c in cards:
+        n = _norm(c.get('name') or '')
+        if not n:
+            continue
+        idx.setdefault(n, []).append(c)
+    return idx
+
+
+def _ngrams(s: str) -> Set[str]:
+    return {s[i : i + NGRAM_SIZE] for i in range(len(s) - NGRAM_SIZE + 1)}
+
+
+def _build_ngram_index(names: List[str]) -> Dict[str, List[int]]:
+    """Map each 3-gram of a lowercase name -> indices (ascending) of the names containing it."""
+    idx: Dict[str, List[int]] = {}
+    for i, name in enumerate(names):
+        for gram in _ngrams(name):
+            idx.setdefault(gram, []).append(i)
+    return idx
+
+
+def _substring_candidates(base: str) -> Iterable[int]:
+    """
+    Indices into CARDS_FLAT whose name may contain `base`, in card order.
+    Intersects the 3-gram posting lists (shortest first); short terms fall back to every card.
+    Callers still need the real `in` check.
+    """
+    if len(base) < NGRAM_SIZE:
+        return range(len(CARDS_FLAT))
+    postings: List[List[int]] = []
+    for gram in _ngrams(base):
+        posting = NGRAM_INDEX.get(gram)
+        if not posting:
+            return ()
+        postings.append(posting)
+    postings.sort(key=len)
+    candidates = set(postings[0])
+    for posting in postings[1:]:
+        candidates.intersection_update(posting)
+        if not candidates:
+            return ()
+    return sorted(candidates)
+
+
+def _lowest_xp(cards: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return min(cards, key=lambda c: (c.get('xp') or 0))
+
+
+def refresh_name_index(cards: List[Dict[str, Any]]) -> None:
+    """Rebuild every lookup structure from a freshly loaded card list."""
+    global NAME_INDEX, NAME_KEYS, CARDS_BY_CODE, CARD_POSITION, LOWEST_XP_BY_NORM, CARDS_FLAT, NAMES_LOWER, NAMES_NORM, NGRAM_INDEX
+    NAME_INDEX = _build_name_index(cards)
+    CARDS_BY_CODE = {}
+    CARD_POSITION = {}
+    for i, c in enumerate(cards):
+        code = c.get('code')
+        if code and code not in CARDS_BY_CODE:
+            CARDS_BY_CODE[code] = c
+            CARD_POSITION[code] = i
+    NAME_KEYS = list(NAME_INDEX.keys())
+    LOWEST_XP_BY_NORM = {n: _lowest_xp(variants) for n, variants in NAME_INDEX.items()}
+    CARDS_FLAT = list(cards)
+    NAMES_LOWER = [(c.get('name') or '').lower() for c in CARDS_FLAT]
+    NAMES_NORM = [_norm(name) for name in NAMES_LOWER]
+    NGRAM_INDEX = _build_ngram_index(NAMES_LOWER)
+    _match_single.cache_clear()
+
+
+@functools.lru_cache(maxsize=1024)
+def _match_single(q: str) -> Tuple[Dict[str, Any], ...]:
+    """
+    Cards matched by one stripped token (see find_matching_cards for the order).
+    Cached across messages; refresh_name_index clears it.
+    """
+    base, level_fn = parse_level_search(q)
+    base_norm = _norm(base)
+
+    # --- EXACT NAME PATH (normalized, e.g., "Lucky!" == "lucky"); prefer exact, skip substring ---
+    if level_fn is None:
+        # No level given -> lowest XP printing only, precomputed per name
+        pick = LOWEST_XP_BY_NORM.get(base_norm)
+        if pick is not None:
+            return (pick,)
+    else:
+        # Level given -> include all printings passing the level filter
+        exacts = [c for c in NAME_INDEX.get(base_norm, []) if level_fn(c)]
+        if exacts:
+            return tuple(exacts)
+
+    # --- SUBSTRING FALLBACK (return one lowest-XP per distinct name) ---
+    by_name_lowest: Dict[str, Dict[str, Any]] = {}
+    for i in _substring_candidates(base):
+        c = CARDS_FLAT[i]
+        if base in NAMES_LOWER[i] and (not level_fn or level_fn(c)):
+            key = NAMES_NORM[i]
+            cur = by_name_lowest.get(key)
+            if cur is None or (c.get('xp') or 0) < (cur.get('xp') or 0):
+                by_name_lowest[key] = c
+
+    if by_name_lowest:
+        return tuple(by_name_lowest.values())
+
+    # --- FUZZY FALLBACK (only if nothing else matched) ---
+    if NAME_KEYS:
+        # Keys are already _norm'ed, so skip RapidFuzz preprocessing and let the cutoff prune early
+        best = _extract_one(
+            base_norm,
+            NAME_KEYS,
+            scorer=fuzz.token_set_ratio,
+            processor=None,
+            score_cutoff=80,  # tweak threshold 75–85 as desired
+        )
+        if best:
+            best_key = best[0]
+            if level_fn:
+                variants = [c for c in NAME_INDEX.get(best_key, []) if level_fn(c)]
+                pick = _lowest_xp(variants) if variants else None
+            else:
+                pick = LOWEST_XP_BY_NORM.get(best_key)
+            if pick:
+                return (pick,)
+
+    return ()
+
+
+def find_matching_cards(queries: List[str], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Matching order per token:
+    1) Exact name (normalized) -> if no (level), pick lowest XP printing; else include all matching level.
+    2) Substring fallback -> one lowest-XP printing per distinct name.
+    3) Fuzzy fallback -> best normalized name over NAME_KEYS, threshold 80; pick lowest XP (respect level if provided).
+    Stops as soon as `limit` cards have matched (no cap when None).
+    """
+    matches: List[Dict[str, Any]] = []
+    seen_codes: Set[str] = set()
+
+    for q in queries:
+        q = q.strip()
+        if not q:
+            continue
+
+        for c in _match_single(q):
+            code = c.get('code')
+            if code and code not in seen_codes:
+                seen_codes.add(code)
+                matches.append(c)
+                if limit is not None and len(matches) >= limit:
+                    return matches
+
+    return matches
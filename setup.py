@@ -0,0 +1,13 @@
+# Optional: compile the card matcher to a C extension with mypyc.
+#   pip install mypy
+#   python setup.py build_ext --inplace
+# The bot imports the compiled `matching` module when the build is present
+# and falls back to matching.py otherwise.
+from setuptools import setup
+from mypyc.build import mypycify
+
+setup(
+    name="agent-of-the-king-matching",
+    py_modules=[],
+    ext_modules=mypycify(["matching.py"]),
+)
@@ -1,6 +1,44 @@
+import importlib.util
+import os
 import sys
+import tempfile
 from pathlib import Path
 
+import pytest
+
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+# app.py builds its AvailabilityStore at import time; keep that database out of the working tree.
+os.environ.setdefault("AVAILABILITY_DB_PATH", os.path.join(tempfile.mkdtemp(), "availability.sqlite"))
+
+BOT_PATH = ROOT / "agent-of-the-king.py"
+
+
+@pytest.fixture(scope="session")
+def bot_module(tmp_path_factory):
+    """The bot script, loaded once with its AvailabilityStore pointed at a temp database."""
+    monkeypatch = pytest.MonkeyPatch()
+    monkeypatch.setenv("AVAILABILITY_DB_PATH", str(tmp_path_factory.mktemp("bot") / "availability.sqlite"))
+    try:
+        spec = importlib.util.spec_from_file_location("agent_of_the_king", BOT_PATH)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        monkeypatch.undo()
+    return module
+
+
+@pytest.fixture
+def bot(bot_module, tmp_path, monkeypatch):
+    """Bot module with an isolated card cache; card list, embed cache and match index are restored afterwards."""
+    import matching
+
+    original_cards = bot_module.CARDS
+    monkeypatch.setattr(bot_module, "CARDS_CACHE_PATH", str(tmp_path / "cards.json"))
+    monkeypatch.setattr(bot_module, "CARDS_CACHE_META_PATH", str(tmp_path / "cards.etag"))
+    yield bot_module
+    bot_module.CARDS = original_cards
+    bot_module.EMBED_CACHE.clear()
+    matching.refresh_name_index(original_cards)
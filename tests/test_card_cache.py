@@ -0,0 +1,96 @@
+import asyncio
+
+
+class FakeResponse:
+    def __init__(self, status, body=b"", headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise RuntimeError(f"HTTP {self.status}")
+
+    async def read(self):
+        return self.body
+
+
+class FakeSession:
+    """Answers 304 to conditional requests unless the card list changed, otherwise serves a fresh list."""
+
+    def __init__(self, changed=False):
+        self.changed = changed
+        self.sent_headers = []
+
+    def get(self, url, allow_redirects=True, headers=None):
+        self.sent_headers.append(dict(headers or {}))
+        if headers and headers.get("If-None-Match") and not self.changed:
+            return FakeResponse(304)
+        return FakeResponse(200, b'[{"code": "02001", "name": "Lucky Cigarette Case"}]', {"ETag": '"v2"'})
+
+
+def write_cache(bot, body=b'[{"code": "01001", "name": "Lucky!"}]'):
+    bot._write_cards_cache(b'[{"code": "01001", "name": "Lucky!"}]', '"v1"', None)
+    with open(bot.CARDS_CACHE_PATH, "wb") as f:
+        f.write(body)
+
+
+def test_card_cache_round_trip(bot):
+    bot._write_cards_cache(b'[{"code": "01001", "name": "Lucky!"}]', '"v1"', "Tue, 01 Oct 2024 00:00:00 GMT")
+
+    assert bot._read_cards_cache_validators() == {"etag": '"v1"', "last_modified": "Tue, 01 Oct 2024 00:00:00 GMT"}
+    assert bot._read_cached_cards() == [{"code": "01001", "name": "Lucky!"}]
+
+
+def test_corrupt_cached_cards_read_as_missing(bot):
+    write_cache(bot, body=b'[{"code": "01')
+
+    assert bot._read_cards_cache_validators() == {"etag": '"v1"'}
+    assert bot._read_cached_cards() is None
+
+
+def test_load_cards_uses_cached_cards_when_not_modified(bot, monkeypatch):
+    write_cache(bot)
+    session = FakeSession()
+    monkeypatch.setattr(bot, "get_http_session", lambda: session)
+
+    asyncio.run(bot.load_cards())
+
+    assert session.sent_headers == [{"If-None-Match": '"v1"'}]
+    assert bot.CARDS == [{"code": "01001", "name": "Lucky!"}]
+
+
+def test_load_cards_skips_cached_body_when_modified(bot, monkeypatch):
+    write_cache(bot)
+    session = FakeSession(changed=True)
+    monkeypatch.setattr(bot, "get_http_session", lambda: session)
+
+    def fail_read():
+        raise AssertionError("cards.json should only be parsed after a 304")
+
+    monkeypatch.setattr(bot, "_read_cached_cards", fail_read)
+
+    asyncio.run(bot.load_cards())
+
+    assert session.sent_headers == [{"If-None-Match": '"v1"'}]
+    assert bot.CARDS == [{"code": "02001", "name": "Lucky Cigarette Case"}]
+    assert bot._read_cards_cache_validators() == {"etag": '"v2"'}
+
+
+def test_load_cards_refetches_when_cached_body_is_corrupt(bot, monkeypatch):
+    write_cache(bot, body=b"[{")
+    session = FakeSession()
+    monkeypatch.setattr(bot, "get_http_session", lambda: session)
+
+    asyncio.run(bot.load_cards())
+
+    assert session.sent_headers == [{"If-None-Match": '"v1"'}, {}]
+    assert bot.CARDS == [{"code": "02001", "name": "Lucky Cigarette Case"}]
+    assert bot._read_cached_cards() == [{"code": "02001", "name": "Lucky Cigarette Case"}]
+    assert bot._read_cards_cache_validators() == {"etag": '"v2"'}
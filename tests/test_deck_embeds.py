@@ -0,0 +1,81 @@
+import matching
+
+
+def card(code, name, type_code, **extra):
+    return {"code": code, "name": name, "type_code": type_code, "url": f"https://arkhamdb.com/card/{code}", **extra}
+
+
+CARDS = [
+    card("01001", "Roland Banks", "investigator"),
+    card("01002", "Flashlight", "asset", slot="Hand"),
+    card("01003", "Hallowed Mirror", "asset", slot="Accessory"),
+    card("01004", "Dark Horse", "asset"),
+    card("01005", "Machete", "asset", slot="Hand", xp=0),
+    card("01006", "Lucky!", "event", xp=2),
+    card("01007", "Charisma", "asset", xp=3, permanent=True),
+    card("01008", "Guts", "skill"),
+    card("01009", "Lone Wolf", "asset", slot=None),
+]
+
+
+def url(code):
+    return f"https://arkhamdb.com/card/{code}"
+
+
+def make_deck(slots, kind="deck"):
+    return {
+        "type": kind,
+        "id": "42",
+        "json": {"investigator_code": "01001", "name": "Flashlight Gang", "version": "1.0", "slots": slots},
+    }
+
+
+def test_build_deck_embeds_groups_cards_by_category_and_slot(bot):
+    matching.refresh_name_index(CARDS)
+    # Slots listed in reverse card-list order, plus a code the card list doesn't know
+    slots = {"99999": 1, "01009": 1, "01008": 1, "01007": 1, "01006": 2, "01005": 2, "01004": 1, "01003": 1, "01002": 2}
+
+    embeds = bot.build_deck_embeds(make_deck(slots))
+
+    assert [(e.title, e.description) for e in embeds] == [
+        ("Roland Banks: Flashlight Gang 1.0", ""),
+        (
+            "Assets",
+            "\n**Accessory:**\n"
+            f"- 1 × [Hallowed Mirror] ({url('01003')})\n"
+            "\n**Hand:**\n"
+            f"- 2 × [Flashlight] ({url('01002')})\n"
+            f"- 2 × [Machete] ({url('01005')})\n"
+            "\n**Other:**\n"
+            f"- 1 × [Dark Horse] ({url('01004')})\n"
+            f"- 1 × [Lone Wolf] ({url('01009')})",
+        ),
+        ("Permanents", f"- 1 × [Charisma] (3) ({url('01007')})"),
+        ("Events", f"- 2 × [Lucky!] (2) ({url('01006')})"),
+        ("Skills", f"- 1 × [Guts] ({url('01008')})"),
+    ]
+    assert embeds[0].url == "https://arkhamdb.com/deck/view/42"
+    assert all(e.footer.text == bot.FOOTER_TEXT for e in embeds)
+
+
+def test_build_deck_embeds_links_decklists(bot):
+    matching.refresh_name_index(CARDS)
+
+    embeds = bot.build_deck_embeds(make_deck({"01008": 1}, kind="decklist"))
+
+    assert embeds[0].url == "https://arkhamdb.com/decklist/view/42"
+
+
+def test_build_deck_embeds_splits_long_categories(bot):
+    assets = [card(f"02{i:03}", f"Overly Long Asset Name Number {i:03}", "asset", slot="Hand") for i in range(60)]
+    matching.refresh_name_index([CARDS[0]] + assets)
+
+    embeds = bot.build_deck_embeds(make_deck({c["code"]: 1 for c in assets}))
+
+    chunks = embeds[1:]
+    lines = ["\n**Hand:**"] + [f"- 1 × [{c['name']}] ({c['url']})" for c in assets]
+    assert len("\n".join(lines)) > 3800
+    assert [e.title for e in chunks] == [f"Assets [{i}/{len(chunks)}]" for i in range(1, len(chunks) + 1)]
+    assert all(len(e.description) <= 1500 for e in chunks)
+    assert "\n".join(e.description for e in chunks) == "\n".join(lines)
+    assert all(e.footer.text == bot.FOOTER_TEXT for e in chunks)
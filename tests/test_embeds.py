@@ -0,0 +1,67 @@
+import asyncio
+
+import discord
+
+LUCKY = {
+    "code": "01080",
+    "name": "Lucky!",
+    "xp": 0,
+    "url": "https://arkhamdb.com/card/01080",
+    "text": "<b>Fast.</b> Play when you would fail a skill test.",
+    "faction": "survivor",
+    "faction_name": "Survivor",
+    "cost": 1,
+    "type_code": "event",
+    "type_name": "Event",
+    "traits": "Fortune.",
+    "imagesrc": "/bundles/cards/01080.png",
+}
+
+
+def test_card_to_embed_returns_the_shared_cached_embed(bot):
+    first = bot.card_to_embed(LUCKY)
+    second = bot.card_to_embed(LUCKY)
+
+    assert second is first
+    assert bot.EMBED_CACHE[LUCKY["code"]] is first
+    assert first.to_dict() == bot._build_card_embed(LUCKY).to_dict()
+    assert first.title == "Lucky!"
+    assert first.description == "**Fast.** Play when you would fail a skill test."
+    assert first.footer.text == bot.FOOTER_TEXT
+
+
+def test_card_to_embed_rebuilds_after_cache_clear(bot):
+    first = bot.card_to_embed(LUCKY)
+    bot.EMBED_CACHE.clear()
+
+    assert bot.card_to_embed(LUCKY) is not first
+
+
+def test_card_to_embed_does_not_cache_cards_without_code(bot):
+    card = {key: value for key, value in LUCKY.items() if key != "code"}
+
+    assert bot.card_to_embed(card) is not bot.card_to_embed(card)
+    assert bot.EMBED_CACHE == {}
+
+
+class RecordingChannel:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, embeds):
+        # Earlier batches take longer, so anything concurrent would arrive out of order
+        await asyncio.sleep(0.01 * (3 - int(embeds[0].title) // 10))
+        self.sent.append([embed.title for embed in embeds])
+
+
+def test_send_embeds_in_batches_keeps_batch_order(bot):
+    embeds = [discord.Embed(title=str(i)) for i in range(25)]
+    channel = RecordingChannel()
+
+    asyncio.run(bot.send_embeds_in_batches(channel, embeds))
+
+    assert channel.sent == [
+        [str(i) for i in range(0, 10)],
+        [str(i) for i in range(10, 20)],
+        [str(i) for i in range(20, 25)],
+    ]
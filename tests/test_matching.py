@@ -0,0 +1,71 @@
+import matching
+
+
+CARDS = [
+    {"code": "01001", "name": "Lucky!", "xp": 0},
+    {"code": "01002", "name": "Lucky!", "xp": 2},
+    {"code": "01003", "name": "Machete", "xp": 0},
+    {"code": "01004", "name": "Magnifying Glass", "xp": 0},
+    {"code": "01005", "name": "Magnifying Glass", "xp": 1},
+    {"code": "01006", "name": "Unexpected Courage", "xp": 0},
+    {"code": "01007", "name": "Unexpected Courage", "xp": 2},
+]
+
+
+def setup_function():
+    matching.refresh_name_index(CARDS)
+
+
+def codes(cards):
+    return [card["code"] for card in cards]
+
+
+def test_norm_strips_case_and_punctuation():
+    assert matching._norm("Lucky!") == "lucky"
+    assert matching._norm("Roland's .38 Special") == "rolands38special"
+    assert matching._norm("Lóst Sóul") == "lstsul"
+    assert matching._norm(None) == ""
+
+
+def test_exact_match_without_level_picks_lowest_xp():
+    assert codes(matching.find_matching_cards(["lucky"])) == ["01001"]
+
+
+def test_exact_match_with_level_filters_printings():
+    assert codes(matching.find_matching_cards(["Lucky! (2)"])) == ["01002"]
+    assert codes(matching.find_matching_cards(["Unexpected Courage (u)"])) == ["01007"]
+
+
+def test_substring_match_returns_lowest_xp_per_name():
+    assert codes(matching.find_matching_cards(["ma"])) == ["01003", "01004"]
+    assert codes(matching.find_matching_cards(["glass"])) == ["01004"]
+
+
+def test_substring_match_with_level_uses_ngram_candidates():
+    assert codes(matching.find_matching_cards(["courage (2)"])) == ["01007"]
+
+
+def test_fuzzy_match_tolerates_typos():
+    assert codes(matching.find_matching_cards(["machetty"])) == ["01003"]
+
+
+def test_no_match_returns_empty_list():
+    assert matching.find_matching_cards(["zzzzzz"]) == []
+
+
+def test_repeated_tokens_are_deduplicated():
+    assert codes(matching.find_matching_cards(["lucky", "Lucky!", " lucky "])) == ["01001"]
+
+
+def test_limit_stops_matching_once_reached():
+    assert codes(matching.find_matching_cards(["lucky", "machete", "glass"], limit=2)) == ["01001", "01003"]
+    assert codes(matching.find_matching_cards(["ma", "lucky"], limit=1)) == ["01003"]
+
+
+def test_refresh_name_index_replaces_cached_matches():
+    assert codes(matching.find_matching_cards(["lucky"])) == ["01001"]
+
+    matching.refresh_name_index([{"code": "02001", "name": "Lucky Cigarette Case", "xp": 0}])
+
+    assert codes(matching.find_matching_cards(["lucky"])) == ["02001"]
+    assert matching.CARDS_BY_CODE == {"02001": {"code": "02001", "name": "Lucky Cigarette Case", "xp": 0}}
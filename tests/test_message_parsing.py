@@ -0,0 +1,55 @@
+import re
+
+import pytest
+
+# The two separate scans on_message used before MESSAGE_RE; scan_message must agree with them.
+OLD_CARD_TOKEN_RE = re.compile(r"\[\[(.+?)\]\]")
+OLD_DECK_URL_RE = re.compile(
+    r"(https?://)?(www\.)?arkhamdb\.com/(deck/view|decklist/view)/([^\s\])\)]*)",
+    re.IGNORECASE,
+)
+
+
+def deck_parts(match):
+    return None if match is None else (match.group("kind"), match.group("tail"))
+
+
+def test_scan_message_finds_cards_and_first_deck(bot_module):
+    tokens, deck = bot_module.scan_message("[[Lucky!]] see https://arkhamdb.com/deck/view/123 and arkhamdb.com/decklist/view/9 [[ Machete ]]")
+
+    assert tokens == ["Lucky!", "Machete"]
+    assert deck_parts(deck) == ("deck/view", "123")
+
+
+def test_scan_message_finds_card_token_right_after_deck_url(bot_module):
+    tokens, deck = bot_module.scan_message("arkhamdb.com/deck/view/123[[Lucky!]]")
+
+    assert tokens == ["Lucky!"]
+    assert deck_parts(deck) == ("deck/view", "123")
+
+
+def test_scan_message_finds_deck_url_inside_card_brackets(bot_module):
+    tokens, deck = bot_module.scan_message("[[https://arkhamdb.com/decklist/view/42/my-deck]]")
+
+    assert tokens == ["https://arkhamdb.com/decklist/view/42/my-deck"]
+    assert deck_parts(deck) == ("decklist/view", "42/my-deck")
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "[[Lucky!]] [[Lucky!]] [[lucky! (2)]]",
+        "www.ArkhamDB.com/decklist/view/55/foo) [[a (2)]]",
+        "[[a]][[b]] arkhamdb.com/deck/view/1 arkhamdb.com/deck/view/2",
+        "(https://arkhamdb.com/deck/view/77)",
+        "[[ ]] no searches here",
+        "[[Machete]] [[https://arkhamdb.com/deck/view/5]] https://arkhamdb.com/deck/view/6",
+    ],
+)
+def test_scan_message_matches_previous_separate_scans(bot_module, content):
+    tokens, deck = bot_module.scan_message(content)
+
+    old_deck = OLD_DECK_URL_RE.search(content)
+    old_tokens = list(dict.fromkeys(t.strip() for t in OLD_CARD_TOKEN_RE.findall(content) if t.strip()))
+    assert tokens == old_tokens
+    assert deck_parts(deck) == (None if old_deck is None else (old_deck.group(3), old_deck.group(4)))